@@ -1,10 +1,13 @@
 
 import wandb
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from itertools import chain
+import numpy as np
 import pandas as pd
 import os
 import datetime
-from typing import List, Dict, Any, Optional, Union, DefaultDict, Set
+from typing import List, Dict, Any, Optional, Union, DefaultDict, Set, Tuple
 
 from metrics import compute_metrics
 
@@ -98,12 +101,169 @@ def get_unique_validator_run_names(
     return {run.name for run in runs}
 
 
+# History columns read by the challenge analysis; uid and prediction columns were renamed across validator versions
+_CHALLENGE_COLUMNS = [
+    '_step', '_timestamp', 'label', 'pred', 'predictions', 'miner_uid', 'miner_uids', 'modality', 'image', 'video']
+
+
+def _fetch_challenge_history(run: Any) -> pd.DataFrame:
+    """
+    Fetch the history of a W&B run, keeping only the columns used for challenge analysis.
+    
+    Args:
+        run: W&B run
+    
+    Returns:
+        History dataframe restricted to challenge columns
+    
+    Notes:
+        History is fetched with a single unkeyed query. Keyed queries only return
+        rows that contain every requested key, and W&B samples each query's rows
+        independently, so separate queries for challenge and media columns cannot
+        be joined reliably. Unused columns are dropped before the dataframe is
+        cached or processed.
+    """
+    history_df = run.history(pandas=True)
+    return history_df[[col for col in _CHALLENGE_COLUMNS if col in history_df.columns]]
+
+
+def _cached_history(run: Any, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Return the challenge history of a run, memoized on disk when a cache directory is given.
+    
+    Args:
+        run: W&B run
+        cache_dir: Optional directory for cached histories (None disables caching)
+    
+    Returns:
+        History dataframe for the run
+    
+    Notes:
+        Entries are keyed by run id and last update time, so histories of runs
+        that are still logging are refetched once they change.
+    """
+    if cache_dir is None:
+        return _fetch_challenge_history(run)
+
+    updated_at = str(run.updated_at).replace(':', '-')
+    cache_path = os.path.join(cache_dir, f"{run.id}-{updated_at}.pkl")
+    if os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+
+    history_df = _fetch_challenge_history(run)
+    os.makedirs(cache_dir, exist_ok=True)
+    history_df.to_pickle(cache_path + '.tmp')
+    os.replace(cache_path + '.tmp', cache_path)
+    return history_df
+
+
+def _fetch_run_histories(
+        wandb_validator_runs: List[Any],
+        max_workers: int = 8,
+        cache_dir: Optional[str] = None) -> List[Tuple[Any, pd.DataFrame]]:
+    """
+    Fetch the history dataframe of each W&B run concurrently.
+    
+    Args:
+        wandb_validator_runs: List of W&B runs
+        max_workers: Number of threads used to fetch histories
+        cache_dir: Optional directory for cached histories (None disables caching)
+    
+    Returns:
+        List of (run, history dataframe) pairs, in the same order as the input runs
+    """
+    runs = list(wandb_validator_runs)
+    if not runs:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(zip(runs, executor.map(lambda run: _cached_history(run, cache_dir), runs)))
+
+
+def _filter_challenges(
+        history_df: pd.DataFrame,
+        uid_col: str,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None) -> pd.DataFrame:
+    """
+    Select the history rows that are well-formed challenges within a time range.
+    
+    Args:
+        history_df: History dataframe of a W&B validator run
+        uid_col: Name of the column holding the challenged miner UIDs
+        start_ts: Optional start timestamp for filtering challenges
+        end_ts: Optional end timestamp for filtering challenges
+    
+    Returns:
+        Filtered view of the history dataframe
+    """
+    mask = ~history_df[uid_col].map(lambda v: isinstance(v, dict))  # ignore improperly formatted instances
+    if start_ts is not None:
+        mask &= history_df['_timestamp'] >= start_ts
+    if end_ts is not None:
+        mask &= history_df['_timestamp'] <= end_ts
+    return history_df.loc[mask]
+
+
+def _compact_dtypes(df: pd.DataFrame, category_cols: List[str]) -> pd.DataFrame:
+    """
+    Store repeated string columns as categoricals and downcast integer miner UIDs.
+    
+    Args:
+        df: Dataframe of per-miner challenge records
+        category_cols: Columns with few distinct values to convert to categoricals
+    
+    Returns:
+        Dataframe with compact column dtypes
+    """
+    df = df.astype({col: 'category' for col in category_cols if col in df.columns})
+    if 'uid' in df.columns and pd.api.types.is_integer_dtype(df['uid']):
+        df['uid'] = pd.to_numeric(df['uid'], downcast='integer')
+    return df
+
+
+def _challenge_modalities(history_df: pd.DataFrame) -> pd.Series:
+    """
+    Get the modality of each challenge, defaulting to 'image' for runs that predate video challenges.
+    
+    Args:
+        history_df: History dataframe of a W&B validator run
+    
+    Returns:
+        Series of challenge modalities aligned with the history dataframe
+    """
+    if 'modality' in history_df.columns:
+        return history_df['modality']
+    return pd.Series('image', index=history_df.index)
+
+
+def _media_paths(history_df: pd.DataFrame, modalities: pd.Series) -> pd.Series:
+    """
+    Resolve the W&B file path of each challenge's media from its modality column.
+    
+    Args:
+        history_df: History dataframe of a W&B validator run
+        modalities: Modality of each challenge, aligned with the history dataframe
+    
+    Returns:
+        Series of media paths, None where a challenge has no logged media
+    """
+    media_paths = np.full(len(history_df), None, dtype=object)
+    for media_col in modalities.dropna().unique():
+        if media_col in history_df.columns:
+            rows = (modalities == media_col).to_numpy()
+            media_paths[rows] = [
+                m.get('path') if isinstance(m, dict) else None for m in history_df.loc[rows, media_col]]
+    return pd.Series(media_paths, index=history_df.index, dtype=object)
+
+
 def compute_miner_performance(
         wandb_validator_runs: List[Any],
         miner_uids: Optional[List[str]] = None, 
         start_ts: Optional[Union[int, float, datetime.datetime]] = None,
         end_ts: Optional[Union[int, float, datetime.datetime]] = None,
-        validator_run_name: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        validator_run_name: Optional[str] = None,
+        max_workers: int = 8,
+        history_cache_dir: Optional[str] = None) -> Dict[str, pd.DataFrame]:
     """
     Compute performance metrics for miners from W&B validator runs.
     
@@ -113,6 +273,8 @@ def compute_miner_performance(
         start_ts: Optional start timestamp for filtering challenges
         end_ts: Optional end timestamp for filtering challenges
         validator_run_name: Optional filter for a specific validator run
+        max_workers: Number of threads used to fetch run histories
+        history_cache_dir: Optional directory for caching run histories on disk
     
     Returns:
         Dictionary containing prediction dataframe and performance metrics dataframe
@@ -123,72 +285,156 @@ def compute_miner_performance(
     if isinstance(end_ts, datetime.datetime):
         end_ts = end_ts.timestamp()
     
-    challenge_data: DefaultDict[str, List[Any]] = defaultdict(list)
+    pred_columns = ['modality', 'uid', 'prediction', 'label', 'wandb_filepath', 'validator_run', 'timestamp']
+    run_frames = []
     
-    for run in wandb_validator_runs:
-        if validator_run_name is not None and run.name != validator_run_name: 
-            continue
+    if validator_run_name is not None:
+        wandb_validator_runs = [run for run in wandb_validator_runs if run.name == validator_run_name]
 
-        history_df = run.history()
-        for _, challenge_row in history_df.iterrows():
-            if start_ts is not None and challenge_row['_timestamp'] < start_ts:
-                continue
-            if end_ts is not None and challenge_row['_timestamp'] > end_ts:
-                continue
+    for run, history_df in _fetch_run_histories(wandb_validator_runs, max_workers, history_cache_dir):
+        pred_col = 'pred' if 'pred' in history_df.columns else 'predictions'
+        uid_col = 'miner_uid' if 'miner_uid' in history_df.columns else 'miner_uids'
+        if history_df.empty or not {uid_col, '_timestamp'}.issubset(history_df.columns):
+            continue  # run logged no challenges
 
-            try:
-                miner_preds = challenge_row['pred']
-            except KeyError:
-                miner_preds = challenge_row['predictions']
-                
-            try:
-                challenge_miner_uids = challenge_row['miner_uid']
-            except KeyError:
-                challenge_miner_uids = challenge_row['miner_uids']
-                
-            if isinstance(challenge_miner_uids, dict):  
-                continue  # ignore improperly formatted instances
-            
-            modality = challenge_row.get('modality', 'image')
-            label = challenge_row['label']
-            
-            # record predictions and labels for each miner
-            for pred, uid in zip(miner_preds, challenge_miner_uids):
-                if miner_uids is not None and uid not in miner_uids:
-                    continue
-                if pred == -1:
-                    continue
-                challenge_data['modality'].append(modality)
-                challenge_data['uid'].append(uid)
-                challenge_data['prediction'].append(pred)
-                challenge_data['label'].append(label)
+        history_df = _filter_challenges(history_df, uid_col, start_ts, end_ts)
+        if history_df.empty:
+            continue
+
+        modality = _challenge_modalities(history_df)
+        wandb_filepath = _media_paths(history_df, modality).fillna('No Media Found')
 
-                try:
-                    challenge_data['wandb_filepath'].append(challenge_row.get(modality, 'video_1')['path'])
-                except Exception:
-                     challenge_data['wandb_filepath'].append('No Media Found')
+        # fan out to one row per (miner, prediction); challenge-level columns are
+        # repeated once per miner so every column is built at its final size.
+        # Like zip(), each challenge is truncated to the shorter of its uid and prediction lists
+        challenge_uids = history_df[uid_col].tolist()
+        challenge_preds = history_df[pred_col].tolist()
+        counts = np.array([min(len(u), len(p)) for u, p in zip(challenge_uids, challenge_preds)], dtype=np.int64)
+        run_df = pd.DataFrame({
+            'modality': np.repeat(modality.to_numpy(), counts),
+            'uid': list(chain.from_iterable(u[:n] for u, n in zip(challenge_uids, counts))),
+            'prediction': list(chain.from_iterable(p[:n] for p, n in zip(challenge_preds, counts))),
+            'label': np.repeat(history_df['label'].to_numpy(), counts),
+            'wandb_filepath': np.repeat(wandb_filepath.to_numpy(), counts),
+            'validator_run': run.name,
+            'timestamp': np.repeat(history_df['_timestamp'].to_numpy(), counts),
+        })
 
-                challenge_data['validator_run'].append(run.name)
-                challenge_data['timestamp'].append(challenge_row['_timestamp'])
+        run_df = run_df[run_df['prediction'] != -1]
+        if miner_uids is not None:
+            run_df = run_df[run_df['uid'].isin(miner_uids)]
+        run_frames.append(run_df)
 
-    all_miner_preds_df = pd.DataFrame(challenge_data)
+    if run_frames:
+        all_miner_preds_df = pd.concat(run_frames, ignore_index=True)
+    else:
+        all_miner_preds_df = pd.DataFrame(columns=pred_columns)
+    all_miner_preds_df = _compact_dtypes(
+        all_miner_preds_df, ['modality', 'wandb_filepath', 'validator_run'])
 
-    # Compute performance metrics for each miner
+    # Compute performance metrics for each miner and modality
+    scored_preds_df = all_miner_preds_df[all_miner_preds_df['modality'].isin(['image', 'video'])]
     miner_perf_data = []
-    for uid, miner_preds in all_miner_preds_df.groupby('uid'):
-        for modality in ['image', 'video']:
-            miner_modality_preds = miner_preds[miner_preds['modality'] == modality]
-            if len(miner_modality_preds) > 0:
-                metrics = compute_metrics(
-                    miner_modality_preds['prediction'].tolist(), 
-                    miner_modality_preds['label'].tolist())
-                metrics['uid'] = uid
-                metrics['modality'] = modality
-                miner_perf_data.append(metrics)
+    # convert prediction lists to one float32 matrix up front and hand each group a row slice
+    scored_preds = np.array(scored_preds_df['prediction'].tolist(), dtype=np.float32)
+    scored_labels = scored_preds_df['label'].to_numpy()
+    grouped = scored_preds_df.groupby(['uid', 'modality'], observed=True)
+    for (uid, modality), positions in sorted(grouped.indices.items()):
+        metrics = compute_metrics(scored_preds[positions], scored_labels[positions])
+        miner_perf_data.append({**metrics._asdict(), 'uid': uid, 'modality': modality})
     
     miner_perf_df = pd.DataFrame(miner_perf_data)
     return {'predictions': all_miner_preds_df, 'performance': miner_perf_df}
 
+class _LocalFileIndex:
+    """
+    Set-like record of existing local files, listing each directory at most once.
+    
+    Membership checks are answered from a cached os.listdir of the parent
+    directory instead of a stat call per path.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, Set[str]] = {}
+
+    def _listing(self, dirname: str) -> Set[str]:
+        if dirname not in self._listings:
+            try:
+                self._listings[dirname] = set(os.listdir(dirname or '.'))
+            except OSError:
+                self._listings[dirname] = set()
+        return self._listings[dirname]
+
+    def __contains__(self, path: str) -> bool:
+        dirname, filename = os.path.split(path)
+        return filename in self._listing(dirname)
+
+    def add(self, path: str) -> None:
+        dirname, filename = os.path.split(path)
+        self._listing(dirname).add(filename)
+
+
+def _download_run_file(run: Any, media_path: str, download_dest: str) -> None:
+    """Resolve a file logged to a W&B run and download it under download_dest."""
+    run.file(media_path).download(download_dest)
+
+
+class _DownloadPool:
+    """
+    Thread pool for media downloads that caps the number of successful downloads.
+    
+    Failed downloads do not count toward the limit. While the downloads in flight
+    could still use up the limit, has_capacity() waits for them to finish, so a
+    failure frees its slot for the next challenge as in a serial download loop.
+    """
+
+    def __init__(
+            self,
+            download_dest: str,
+            max_workers: int = 32,
+            limit: Optional[int] = None,
+            verbose: bool = True):
+        self.download_dest = download_dest
+        self.limit = limit
+        self.verbose = verbose
+        self.failed_paths: Set[str] = set()
+        self._succeeded = 0
+        self._in_flight: Dict[Future, Tuple[str, str]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def __enter__(self) -> '_DownloadPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for future in as_completed(list(self._in_flight)):
+            self._collect(future)
+        self._executor.shutdown()
+
+    def has_capacity(self) -> bool:
+        """Whether another download may be started without exceeding the limit."""
+        if not self.limit:
+            return True
+        while self._in_flight and self._succeeded + len(self._in_flight) >= self.limit:
+            done, _ = wait(list(self._in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                self._collect(future)
+        return self._succeeded + len(self._in_flight) < self.limit
+
+    def submit(self, run: Any, media_path: str, local_path: str, modality: str) -> None:
+        future = self._executor.submit(_download_run_file, run, media_path, self.download_dest)
+        self._in_flight[future] = (local_path, modality)
+
+    def _collect(self, future: Future) -> None:
+        local_path, modality = self._in_flight.pop(future)
+        try:
+            future.result()
+            self._succeeded += 1
+        except Exception as e:
+            self.failed_paths.add(local_path)
+            if self.verbose:
+                print(f'Failed to download {modality}: {e}')
+
+
 def download_challenge_media(
         wandb_validator_runs: List[Any],
         download_dest: str = '',
@@ -199,7 +445,11 @@ def download_challenge_media(
         start_ts: Optional[Union[int, float, datetime.datetime]] = None,
         end_ts: Optional[Union[int, float, datetime.datetime]] = None,
         validator_run_name: Optional[str] = None,
-        verbose: bool = True) -> pd.DataFrame:
+        verbose: bool = True,
+        max_workers: int = 8,
+        history_cache_dir: Optional[str] = None,
+        download_workers: int = 32,
+        return_df: bool = True) -> Optional[pd.DataFrame]:
     """
     Download images and videos from W&B validator runs and return a dataframe with filepaths.
     
@@ -214,9 +464,14 @@ def download_challenge_media(
         end_ts: Optional end timestamp for filtering challenges
         validator_run_name: Optional filter for a specific validator run
         verbose: Whether to print download progress messages
+        max_workers: Number of threads used to fetch run histories
+        history_cache_dir: Optional directory for caching run histories on disk
+        download_workers: Number of threads used to download media files
+        return_df: Whether to build the returned dataframe (False only downloads files)
     
     Returns:
-        Dataframe containing challenge and media information including local filepaths
+        Dataframe containing challenge and media information including local filepaths,
+        or None if return_df is False
     """
     # Standardize datetime inputs
     if isinstance(start_ts, datetime.datetime):
@@ -224,124 +479,135 @@ def download_challenge_media(
     if isinstance(end_ts, datetime.datetime):
         end_ts = end_ts.timestamp()
         
+    if not download_images and not download_videos:
+        return pd.DataFrame() if return_df else None
+
     # Create destination directory if it doesn't exist
-    if download_dest and not os.path.exists(download_dest):
-        os.makedirs(download_dest)
+    if download_dest:
+        os.makedirs(download_dest, exist_ok=True)
         
-    download_data: DefaultDict[str, List[Any]] = defaultdict(list)
-    downloaded = 0
+    run_frames = []
+    local_files = _LocalFileIndex()
     
-    for run in wandb_validator_runs:
-        if validator_run_name is not None and run.name != validator_run_name: 
-            continue
+    if validator_run_name is not None:
+        wandb_validator_runs = [run for run in wandb_validator_runs if run.name == validator_run_name]
 
-        history_df = run.history()
-        for _, challenge_row in history_df.iterrows():
-            if start_ts is not None and challenge_row['_timestamp'] < start_ts:
-                continue
-            if end_ts is not None and challenge_row['_timestamp'] > end_ts:
-                continue
+    # Downloads run in the background while the histories are scanned; records of
+    # failed downloads are dropped once every download has finished
+    with _DownloadPool(download_dest, download_workers, download_limit, verbose) as downloads:
+        for run, history_df in _fetch_run_histories(wandb_validator_runs, max_workers, history_cache_dir):
+            uid_col = 'miner_uid' if 'miner_uid' in history_df.columns else 'miner_uids'
+            if history_df.empty or not {uid_col, '_timestamp'}.issubset(history_df.columns):
+                continue  # run logged no challenges
+            history_df = _filter_challenges(history_df, uid_col, start_ts, end_ts)
 
-            try:
-                challenge_miner_uids = challenge_row['miner_uid']
-            except KeyError:
-                challenge_miner_uids = challenge_row['miner_uids']
-                
-            if isinstance(challenge_miner_uids, dict):  
-                continue  # ignore improperly formatted instances
-                
-            # Skip if we're filtering by miner UIDs and none of the UIDs match
-            if miner_uids is not None and not any(uid in miner_uids for uid in challenge_miner_uids):
-                continue
+            modalities = _challenge_modalities(history_df)
+            challenges = zip(
+                history_df['_timestamp'], history_df[uid_col], modalities, _media_paths(history_df, modalities))
+
+            download_data: DefaultDict[str, List[Any]] = defaultdict(list)
+            for timestamp, challenge_miner_uids, modality, media_path in challenges:
+                # Skip if we're filtering by miner UIDs and none of the UIDs match
+                if miner_uids is not None and not any(uid in miner_uids for uid in challenge_miner_uids):
+                    continue
                 
-            modality = challenge_row.get('modality', 'image')
+                # Process the media file
+                should_download = ((modality == 'image' and download_images) or 
+                                   (modality == 'video' and download_videos))
             
-            # Process the media file
-            should_download = ((modality == 'image' and download_images) or 
-                               (modality == 'video' and download_videos))
-            
-            if should_download and (not download_limit or downloaded < download_limit):
-                try:
-                    media_path = challenge_row[modality]['path']
-                    filename = os.path.basename(media_path)
+                if should_download and downloads.has_capacity():
+                    if media_path is None:
+                        if verbose:
+                            print(f'Failed to download {modality}: no media logged for challenge')
+                        continue
+
                     local_path = os.path.join(download_dest, media_path)
-                    if not os.path.exists(local_path):
+                    if local_path not in local_files:
                         if verbose:
                             print(f"Downloading {modality}: {media_path}")
-                        run.file(media_path).download(download_dest)
-                        downloaded += 1
+                        downloads.submit(run, media_path, local_path, modality)
+                        local_files.add(local_path)
                     else:
                         if verbose:
                             print(f"File already exists: {local_path}")
-                    
+                
+                    if not return_df:
+                        continue
+
                     # Record information for all miners involved
                     for uid in challenge_miner_uids:
                         if miner_uids is not None and uid not in miner_uids:
                             continue
-                            
-                        download_data['validator_run'].append(run.name)
+                        
                         download_data['modality'].append(modality)
                         download_data['uid'].append(uid)
                         download_data['wandb_filepath'].append(media_path)
                         download_data['local_filepath'].append(local_path)
-                        download_data['timestamp'].append(challenge_row['_timestamp'])
-                        
-                except Exception as e:
-                    if verbose:
-                        print(f'Failed to download {modality}: {e}')
-            else:
-                # Even if we don't download, record the information
-                for uid in challenge_miner_uids:
-                    if miner_uids is not None and uid not in miner_uids:
-                        continue
-                        
-                    try:
-                        media_path = challenge_row.get(modality, 'video_1')['path']
-                        local_path = os.path.join(download_dest, os.path.basename(media_path))
-                        local_path = local_path if os.path.exists(local_path) else 'not downloaded'
-
-                    except: 
+                        download_data['timestamp'].append(timestamp)
+                elif return_df:
+                    # Even if we don't download, record the information
+                    if media_path is None:
                         media_path = ''
                         local_path = 'Download Failed'
-                        download_data['validator_run'].append(run.name)
+                    else:
+                        local_path = os.path.join(download_dest, media_path)
+                        local_path = local_path if local_path in local_files else 'not downloaded'
+
+                    for uid in challenge_miner_uids:
+                        if miner_uids is not None and uid not in miner_uids:
+                            continue
+                        
                         download_data['modality'].append(modality)
                         download_data['uid'].append(uid)
-                        download_data['timestamp'].append(challenge_row['_timestamp'])
                         download_data['wandb_filepath'].append(media_path)
                         download_data['local_filepath'].append(local_path)
-    
-    return pd.DataFrame(download_data)
+                        download_data['timestamp'].append(timestamp)
+
+            if download_data:
+                run_frames.append(pd.DataFrame({'validator_run': run.name, **download_data}))
+
+    if not return_df:
+        return None
+
+    download_df = pd.concat(run_frames, ignore_index=True) if run_frames else pd.DataFrame()
+    if downloads.failed_paths:
+        download_df = download_df[~download_df['local_filepath'].isin(downloads.failed_paths)].reset_index(drop=True)
+    return _compact_dtypes(download_df, ['validator_run', 'modality', 'wandb_filepath'])
 
 
 def merge_performance_and_downloads(
         predictions_df: pd.DataFrame,
-        download_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        download_df: Optional[pd.DataFrame]) -> pd.DataFrame:
     """
     Merge the performance results with the download dataframe.
     
     Args:
-        perf_results: Dictionary containing 'predictions' and 'performance' dataframes
-        download_df: Dataframe with download information
+        predictions_df: Prediction dataframe from compute_miner_performance
+        download_df: Dataframe with download information (None if nothing was downloaded)
     
     Returns:
-        Dictionary with merged prediction dataframe and the original performance dataframe
+        Prediction dataframe with a local_filepath column for each prediction
     """
-    if download_df.empty:
-        return predictions_df
-        
+    if download_df is None or download_df.empty:
+        return predictions_df.assign(local_filepath='not downloaded')
+
+    # Join on categorical filepaths sharing one category set so the key is hashed as integer codes
+    filepath_dtype = pd.CategoricalDtype(
+        predictions_df['wandb_filepath'].astype('category').cat.categories.union(
+            download_df['wandb_filepath'].astype('category').cat.categories))
+    predictions_df = predictions_df.astype({'wandb_filepath': filepath_dtype})
+    download_keys_df = download_df[['wandb_filepath', 'uid', 'local_filepath']].astype(
+        {'wandb_filepath': filepath_dtype})
 
-    predictions_df['join_key'] = predictions_df['wandb_filepath'] + '|' + predictions_df['uid'].astype(str)
-    download_df['join_key'] = download_df['wandb_filepath'] + '|' + download_df['uid'].astype(str)
-    
     merged_df = pd.merge(
         predictions_df,
-        download_df[['join_key', 'local_filepath']],
-        on='join_key',
+        download_keys_df,
+        on=['wandb_filepath', 'uid'],
         how='left',
         suffixes=('', '_download')
     )
     merged_df['local_filepath'] = merged_df['local_filepath'].fillna('not downloaded')
-    return merged_df.drop(columns=['join_key'])
+    return merged_df
     
 
 
@@ -1,3 +1,4 @@
+import ast
 import os
 import pandas as pd
 import numpy as np
@@ -5,6 +6,31 @@ from typing import Optional, List, Union, Dict, Any
 from datetime import datetime
 
 
+# Translation table for escaping text interpolated into the gallery HTML
+_HTML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#39;',
+})
+
+
+def _escape_html(value: Any) -> str:
+    """Convert a value to text that is safe to embed in HTML content or attributes."""
+    return str(value).translate(_HTML_ESCAPE_TABLE)
+
+
+def _parse_prediction(prediction: Any) -> Any:
+    """Convert a string representation of a prediction list (e.g. read back from CSV) to a list."""
+    if isinstance(prediction, str) and '[' in prediction and ']' in prediction:
+        try:
+            return ast.literal_eval(prediction)
+        except (ValueError, SyntaxError):
+            pass
+    return prediction
+
+
 def generate_media_gallery(
     df: pd.DataFrame,
     output_path: str = "media_gallery.html",
@@ -43,28 +69,39 @@ def generate_media_gallery(
         print("No valid media files found in the dataframe.")
         return None
     
+    # Parse predictions once, then precompute the predicted class and correctness for
+    # all rows at once, stacking the predictions into a 2-D array when they have a uniform length
+    valid_df['prediction'] = valid_df['prediction'].map(_parse_prediction)
+    try:
+        pred_classes = np.stack(valid_df['prediction'].to_numpy()).argmax(axis=1)
+    except (ValueError, TypeError):
+        pred_classes = np.array([np.argmax(p) for p in valid_df['prediction']])
+    if 'label' in valid_df.columns:
+        labels = valid_df['label'].to_numpy()
+    else:
+        labels = np.full(len(valid_df), 'N/A', dtype=object)
+    valid_df['_pred_class'] = pred_classes
+    valid_df['_multiclass_correct'] = pred_classes == labels
+    valid_df['_binary_correct'] = np.isin(pred_classes, [1, 2]) == np.isin(labels, [1, 2])
+    
     # Group by media file path to combine multiple predictions for the same media
     media_groups = []
     
     # Find unique media files while keeping track of all predictions
-    for filepath, group_df in valid_df.groupby('local_filepath'):        # Create a record for this media file
+    prediction_cols = [col for col in valid_df.columns if col != 'local_filepath']
+    per_prediction_cols = ['uid', 'prediction', '_pred_class', '_multiclass_correct', '_binary_correct']
+    for filepath, group_df in valid_df.groupby('local_filepath'):
+        # Create a record for this media file with all of its predictions
+        predictions = group_df[prediction_cols].to_dict(orient='records')
         media_item = {
-            'local_filepath': group_df['local_filepath'].iloc[0],
-            'predictions': []
+            'local_filepath': filepath,
+            'predictions': predictions
         }
-        # Store all predictions for this media
-        for _, row in group_df.iterrows():
-            prediction_item = {}
-            for col in group_df.columns:
-                if col != 'local_filepath':
-                    prediction_item[col] = row[col]
-            media_item['predictions'].append(prediction_item)
         
-        # Add some common metadata from the first row
-        for col in group_df.columns:
-            if col not in ['uid', 'prediction', 'local_filepath']:
-                # For shared metadata, take the first value
-                media_item[col] = group_df[col].iloc[0]
+        # Add some common metadata, taking shared values from the first row
+        for col, value in predictions[0].items():
+            if col not in per_prediction_cols:
+                media_item[col] = value
         
         media_groups.append(media_item)
     
@@ -101,8 +138,10 @@ def generate_media_gallery(
         metadata_cols = [col for col in all_cols if col not in 
                         ['local_filepath', 'predictions', 'uid', 'prediction']]
     
-    # Generate HTML
-    html = f"""
+    title = _escape_html(title)
+    
+    # Generate HTML as a list of fragments that is joined once at the end
+    html_parts = [f"""
     <!DOCTYPE html>
     <html>
     <head>
@@ -205,45 +244,45 @@ def generate_media_gallery(
         <h1>{title}</h1>
         <p class="item-count">Showing {len(media_groups)} unique media items with {len(valid_df)} total predictions | Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
         <div class="gallery">
-    """
+    """]
     
     # Add each media item with its metadata
     for i, media_item in enumerate(media_groups):
-        filepath = media_item['local_filepath']
-        file_ext = os.path.splitext(filepath)[1].lower()
-        html += f'<div class="media-item">\n'
-        html += f'    <div class="media-container">\n'
+        file_ext = _escape_html(os.path.splitext(media_item['local_filepath'])[1].lower())
+        filepath = _escape_html(media_item['local_filepath'])
+        html_parts.append(
+            '<div class="media-item">\n'
+            '    <div class="media-container">\n')
         
         # Handle different media types
         if file_ext in ['.png', '.jpg', '.jpeg', '.bmp', '.webp']:
             # Image files
-            html += f'        <img src="{filepath}" alt="Image {i+1}">\n'
+            html_parts.append(f'        <img src="{filepath}" alt="Image {i+1}">\n')
         elif file_ext in ['.mp4', '.webm', '.ogg', '.mov']:
             # Video files
-            html += f'        <video controls>\n'
-            html += f'            <source src="{filepath}" type="video/{file_ext[1:]}">\n'
-            html += f'            Your browser does not support the video tag.\n'
-            html += f'        </video>\n'
+            html_parts.append(
+                '        <video controls>\n'
+                f'            <source src="{filepath}" type="video/{file_ext[1:]}">\n'
+                '            Your browser does not support the video tag.\n'
+                '        </video>\n')
         elif file_ext == '.gif':
             # GIF files (treat as images)
-            html += f'        <img src="{filepath}" alt="GIF {i+1}">\n'
+            html_parts.append(f'        <img src="{filepath}" alt="GIF {i+1}">\n')
         else:
             # Unknown file type
-            html += f'        <p>Unsupported media type: {file_ext}</p>\n'
-            html += f'        <p>Path: {filepath}</p>\n'
+            html_parts.append(
+                f'        <p>Unsupported media type: {file_ext}</p>\n'
+                f'        <p>Path: {filepath}</p>\n')
         
-        html += f'    </div>\n'
-        
-        # Add metadata
-        html += f'    <div class="metadata">\n'
-        
-        # First, show common metadata for this media
-        html += f'        <h3>Media Information</h3>\n'
-        html += f'        <table>\n'
-        html += f'            <tr><th>Property</th><th>Value</th></tr>\n'
-        
-        # Always include local filepath
-        html += f'            <tr><td>local_filepath</td><td>{media_item["local_filepath"]}</td></tr>\n'
+        # Add metadata, starting with the common metadata for this media
+        # (local filepath is always included)
+        html_parts.append(
+            '    </div>\n'
+            '    <div class="metadata">\n'
+            '        <h3>Media Information</h3>\n'
+            '        <table>\n'
+            '            <tr><th>Property</th><th>Value</th></tr>\n'
+            f'            <tr><td>local_filepath</td><td>{filepath}</td></tr>\n')
         
         for col in metadata_cols:
             if col in media_item and col != 'local_filepath':  # Skip filepath as we already added it
@@ -260,59 +299,32 @@ def generate_media_gallery(
                 if isinstance(value, (list, dict)):
                     value = str(value)
                 
-                html += f'            <tr><td>{col}</td><td>{value}</td></tr>\n'
-        
-        html += f'        </table>\n'
+                html_parts.append(f'            <tr><td>{_escape_html(col)}</td><td>{_escape_html(value)}</td></tr>\n')
         
         # Then, show all predictions for this media
-        html += f'        <h3>Predictions ({len(media_item["predictions"])})</h3>\n'
-        html += f'        <table class="predictions-table">\n'
-        html += f'            <tr><th>Miner UID</th><th>Prediction</th><th>Label</th><th>Binary Correct</th><th>Multiclass Correct</th></tr>\n'
+        html_parts.append(
+            '        </table>\n'
+            f'        <h3>Predictions ({len(media_item["predictions"])})</h3>\n'
+            '        <table class="predictions-table">\n'
+            '            <tr><th>Miner UID</th><th>Prediction</th><th>Label</th><th>Binary Correct</th><th>Multiclass Correct</th></tr>\n')
         
         for pred in media_item['predictions']:
             uid = pred.get('uid', 'Unknown')
             prediction = pred.get('prediction', 'N/A')
             label = pred.get('label', 'N/A')
             
-            # Format prediction to bold the largest value if it's a list or similar
-            prediction_display = prediction
-            if isinstance(prediction, (list, tuple, np.ndarray)) or (isinstance(prediction, str) and '[' in prediction and ']' in prediction):
-                # Convert string representation of list to actual list if needed
-                if isinstance(prediction, str):
-                    try:
-                        # Try to convert "[0.1, 0.2, 0.7]" to a list
-                        import ast
-                        prediction_values = ast.literal_eval(prediction)
-                    except:
-                        prediction_values = prediction
-                else:
-                    prediction_values = prediction
-                
-                # If it's now a list-like object, format it with the max value in bold
-                if isinstance(prediction_values, (list, tuple, np.ndarray)):
-                    if len(prediction_values) > 0:
-                        max_index = np.argmax(prediction_values)
-                        prediction_str = str(prediction_values)
-                        # Convert "[0.1, 0.2, 0.7]" to "[0.1, 0.2, <b>0.7</b>]"
-                        parts = prediction_str.split(str(prediction_values[max_index]))
-                        if len(parts) >= 2:
-                            prediction_display = parts[0] + f"<b>{prediction_values[max_index]}</b>" + parts[1]
-                        else:
-                            prediction_display = prediction_str
-                    else:
-                        prediction_display = str(prediction_values)
-                else:
-                    prediction_display = str(prediction)
-            
-            # Check multiclass correctness (exact match)
-            multiclass_correct = np.argmax(prediction) == label
+            # Format prediction with the predicted (largest) value in bold, e.g. "[0.1, 0.2, <b>0.7</b>]"
+            if isinstance(prediction, (list, tuple, np.ndarray)) and len(prediction) > 0:
+                pred_class = pred['_pred_class']
+                prediction_display = '[' + ', '.join(
+                    f'<b>{_escape_html(v)}</b>' if j == pred_class else _escape_html(v)
+                    for j, v in enumerate(prediction)) + ']'
+            else:
+                prediction_display = _escape_html(prediction)
             
-            # Check binary correctness (both 1 or 2, or both something else)
-            binary_correct = False
-            if label in [1, 2] and np.argmax(prediction) in [1, 2]:
-                binary_correct = True
-            elif label not in [1, 2] and np.argmax(prediction) not in [1, 2]:
-                binary_correct = True
+            # Multiclass: exact match; binary: both 1 or 2, or both something else
+            multiclass_correct = pred['_multiclass_correct']
+            binary_correct = pred['_binary_correct']
             
             # Determine row class based on correctness
             if binary_correct and multiclass_correct:
@@ -328,25 +340,28 @@ def generate_media_gallery(
                 binary_icon = "✗"
                 multiclass_icon = "✗"
             
-            html += f'            <tr class="{row_class}"><td>{uid}</td><td>{prediction_display}</td><td>{label}</td><td>{binary_icon}</td><td>{multiclass_icon}</td></tr>\n'
+            html_parts.append(f'            <tr class="{row_class}"><td>{_escape_html(uid)}</td><td>{prediction_display}</td><td>{_escape_html(label)}</td><td>{binary_icon}</td><td>{multiclass_icon}</td></tr>\n')
         
-        html += f'        </table>\n'
-        html += f'    </div>\n'
-        html += f'</div>\n'
+        html_parts.append(
+            '        </table>\n'
+            '    </div>\n'
+            '</div>\n')
     
     # Close HTML
-    html += """
+    html_parts.append("""
         </div>
     </body>
     </html>
-    """
+    """)
     
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    # Create directory if it doesn't exist (a bare filename is written to the working directory)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
     
     # Write HTML to file
     with open(output_path, 'w') as f:
-        f.write(html)
+        f.write(''.join(html_parts))
     
     print(f"Gallery generated successfully at: {output_path}")
     return output_path
@@ -1,6 +1,86 @@
 
 
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, matthews_corrcoef
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+
+class MetricsResult(NamedTuple):
+    """Multiclass and binary metrics for one set of predictions; use ._asdict() for a dict."""
+    multiclass_accuracy: float
+    multiclass_precision: float
+    multiclass_recall: float
+    multiclass_f1: float
+    multiclass_mcc: float
+    binary_accuracy: float
+    binary_precision: float
+    binary_recall: float
+    binary_f1: float
+    binary_auc: float
+    binary_mcc: float
+    sample_size: int
+
+
+def _confusion_matrix(labels, pred_labels, n_classes):
+    """
+    Count (true, predicted) label pairs in a single bincount pass.
+
+    Parameters:
+    labels (np.ndarray): True class indices
+    pred_labels (np.ndarray): Predicted class indices
+    n_classes (int): Number of classes
+
+    Returns:
+    np.ndarray: (n_classes, n_classes) matrix with true classes as rows and predicted classes as columns
+    """
+    # widen only for the index math so int8 inputs cannot overflow
+    pair_index = labels.astype(np.int64) * n_classes + pred_labels.astype(np.int64)
+    return np.bincount(pair_index, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def _matthews_corrcoef(confusion):
+    """
+    Matthews correlation coefficient (Gorodkin's R_K for more than two classes) of a confusion matrix.
+
+    Parameters:
+    confusion (np.ndarray): Square confusion matrix with true classes as rows
+
+    Returns:
+    float: MCC in [-1, 1], or 0.0 when undefined
+    """
+    true_counts = confusion.sum(axis=1).astype(np.float64)
+    pred_counts = confusion.sum(axis=0).astype(np.float64)
+    n_samples = true_counts.sum()
+    cov_true_pred = float(np.trace(confusion)) * n_samples - pred_counts @ true_counts
+    cov_pred_pred = n_samples ** 2 - pred_counts @ pred_counts
+    cov_true_true = n_samples ** 2 - true_counts @ true_counts
+    if cov_pred_pred * cov_true_true == 0:
+        return 0.0
+    return float(cov_true_pred / math.sqrt(cov_true_true * cov_pred_pred))
+
+
+def _binary_auc(binary_labels, scores):
+    """
+    ROC AUC via the Mann-Whitney U statistic, using average ranks for tied scores.
+
+    Parameters:
+    binary_labels (np.ndarray): True binary labels (0 or 1)
+    scores (np.ndarray): Scores for the positive class
+
+    Returns:
+    float: ROC AUC, or nan when only one class is present
+    """
+    positives = binary_labels == 1
+    n_pos = int(positives.sum())
+    n_neg = len(binary_labels) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float('nan')
+    # 1-based average rank of each distinct score, mapped back onto the samples
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    avg_ranks = np.cumsum(counts) - (counts - 1) / 2
+    pos_rank_sum = avg_ranks[inverse[positives]].sum()
+    return float((pos_rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
 
 
 def compute_metrics(predictions, labels):
@@ -8,47 +88,80 @@ def compute_metrics(predictions, labels):
     Compute multiclass and binary metrics from predictions and labels.
 
     Parameters:
-    predictions (list): List of predicted class probabilities (softmax outputs)
-    labels (list): List of true labels
+    predictions (array-like): Predicted class probabilities (softmax outputs), one row per sample.
+        A 2-D float32 ndarray of shape (n_samples, n_classes) is used as-is without copying
+    labels (array-like): True labels
 
     Returns:
-    dict: A dictionary with multiclass and binary metrics
+    MetricsResult: Named tuple with multiclass and binary metrics
     """
+    if isinstance(predictions, np.ndarray) and predictions.dtype != object:
+        preds = predictions.astype(np.float32, copy=False)
+    else:
+        # nested lists, or an object array holding one prediction list per sample
+        preds = np.array(list(predictions), dtype=np.float32)
+    # class indices are 0-2, so one byte per sample is enough
+    labels = np.asarray(labels).astype(np.int8, copy=False)
+
     # Convert softmax predictions to class labels
-    pred_labels = [p.index(max(p)) for p in predictions]
-    
-    # Multiclass metrics
-    multi_accuracy = accuracy_score(labels, pred_labels)
-    multi_precision = precision_score(labels, pred_labels, average='weighted', zero_division=0)
-    multi_recall = recall_score(labels, pred_labels, average='weighted', zero_division=0)
-    multi_f1 = f1_score(labels, pred_labels, average='weighted', zero_division=0)
-    multi_mcc = matthews_corrcoef(labels, pred_labels)
-
-    # Convert to binary by combining labels 1 and 2
-    binary_labels = [1 if l > 0 else 0 for l in labels]
-    binary_preds = [1 if p > 0 else 0 for p in pred_labels]
+    if preds.shape[1] == 3:
+        # unrolled 3-way argmax; strict comparisons keep argmax's first-max tie-breaking
+        p0, p1, p2 = preds[:, 0], preds[:, 1], preds[:, 2]
+        pred_labels = (p1 > p0).view(np.int8)
+        pred_labels[p2 > np.maximum(p0, p1)] = 2
+    else:
+        pred_labels = preds.argmax(axis=1).astype(np.int8)
     
-    # Sum probabilities for classes 1 and 2 for binary AUC
-    binary_probs = [p[1] + p[2] for p in predictions]
-
-    binary_accuracy = accuracy_score(binary_labels, binary_preds)
-    binary_precision = precision_score(binary_labels, binary_preds, zero_division=0)
-    binary_recall = recall_score(binary_labels, binary_preds, zero_division=0)
-    binary_f1 = f1_score(binary_labels, binary_preds, zero_division=0)
-    binary_auc = roc_auc_score(binary_labels, binary_probs)
-    binary_mcc = matthews_corrcoef(binary_labels, binary_preds)
+    # Multiclass metrics from a single confusion matrix (rows: true class, columns: predicted class)
+    n_classes = preds.shape[1]
+    confusion = _confusion_matrix(labels, pred_labels, n_classes)
+    true_pos = np.diag(confusion)
+    support = confusion.sum(axis=1)
+    pred_pos = confusion.sum(axis=0)
+
+    # Per-class scores (0 where undefined), averaged with support weights
+    class_weights = support / support.sum()
+    multi_accuracy = float(true_pos.sum() / support.sum())
+    # np.maximum keeps the divisions finite, np.where selects 0 for undefined classes
+    class_precision = np.where(pred_pos > 0, true_pos / np.maximum(pred_pos, 1), 0.0)
+    class_recall = np.where(support > 0, true_pos / np.maximum(support, 1), 0.0)
+    f1_denom = support + pred_pos
+    class_f1 = np.where(f1_denom > 0, 2 * true_pos / np.maximum(f1_denom, 1), 0.0)
+    multi_precision = float(class_weights @ class_precision)
+    multi_recall = float(class_weights @ class_recall)
+    multi_f1 = float(class_weights @ class_f1)
+    multi_mcc = _matthews_corrcoef(confusion)
+
+    # Convert to binary by combining labels 1 and 2; the binary confusion matrix
+    # comes from collapsing the multiclass one, so predictions are not rescanned
+    binary_labels = (labels > 0).view(np.int8)
+    binary_confusion = np.array([
+        [confusion[0, 0], confusion[0, 1:].sum()],
+        [confusion[1:, 0].sum(), confusion[1:, 1:].sum()]])
+
+    # Sum probabilities for classes 1 and 2 for binary AUC, accumulating in float64 for precision
+    binary_probs = preds[:, 1:3].sum(axis=1, dtype=np.float64)
+
+    # Scalar arithmetic on Python ints, so the MCC products cannot overflow
+    (tn, fp), (fn, tp) = binary_confusion.tolist()
+    binary_accuracy = (tp + tn) / len(labels)
+    binary_precision = tp / (tp + fp) if tp + fp else 0.0
+    binary_recall = tp / (tp + fn) if tp + fn else 0.0
+    binary_f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0
+    mcc_denom = math.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+    binary_mcc = (tp * tn - fp * fn) / mcc_denom if mcc_denom else 0.0
+    binary_auc = _binary_auc(binary_labels, binary_probs)
     
-    return {
-        "multiclass_accuracy": multi_accuracy,
-        "multiclass_precision": multi_precision, 
-        "multiclass_recall": multi_recall,
-        "multiclass_f1": multi_f1,
-        "multiclass_mcc": multi_mcc,
-        "binary_accuracy": binary_accuracy,
-        "binary_precision": binary_precision,
-        "binary_recall": binary_recall,
-        "binary_f1": binary_f1,
-        "binary_auc": binary_auc,
-        "binary_mcc": binary_mcc,
-        "sample_size": len(predictions)
-    }
\ No newline at end of file
+    return MetricsResult(
+        multiclass_accuracy=multi_accuracy,
+        multiclass_precision=multi_precision,
+        multiclass_recall=multi_recall,
+        multiclass_f1=multi_f1,
+        multiclass_mcc=multi_mcc,
+        binary_accuracy=binary_accuracy,
+        binary_precision=binary_precision,
+        binary_recall=binary_recall,
+        binary_f1=binary_f1,
+        binary_auc=binary_auc,
+        binary_mcc=binary_mcc,
+        sample_size=len(predictions))